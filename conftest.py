@@ -0,0 +1 @@
+# Keeps the repo root on sys.path so tests can import lab_connecting_python_sql
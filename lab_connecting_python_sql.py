@@ -17,20 +17,68 @@ Lab requirements:
 How to run:
 - Update the credentials in the __main__ block
 - Run the file: python lab_connecting_python_sql.py
+- Raw rentals are cached as parquet in .cache/ (or $RENTALS_CACHE_DIR); delete it to force a refetch
+- SUMMARY_ONLY=1 python lab_connecting_python_sql.py -> only summary_metrics.csv (one query)
 """
 
 from __future__ import annotations
 
+import contextlib
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql.elements import TextClause
 from urllib.parse import quote_plus
 
+# pyarrow is optional: it formats CSV in C, much faster than DataFrame.to_csv.
+# Without it I simply fall back to pandas.
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+    pa_csv = None
+
+# connectorx is optional too: it reads query results straight into columns
+# (Arrow, multi-threaded, in Rust) instead of building Python row tuples first.
+# I only use it for the raw rentals (see read_rows).
+try:
+    import connectorx as cx
+except ImportError:  # pragma: no cover - depends on the environment
+    cx = None
+
+# polars is optional: when installed, compare_rentals runs its join in polars
+# (multi-threaded hash join on Arrow columns).
+try:
+    import polars as pl
+except ImportError:  # pragma: no cover - depends on the environment
+    pl = None
+
 
 # -----------------------------------------------------------------------------
 # 0) Connection helper
 # -----------------------------------------------------------------------------
+def _mysql_driver() -> str:
+    """
+    Pick the MySQL driver for the connection string.
+
+    - mysqlclient (module MySQLdb) is a C extension: rows are decoded in C.
+    - pymysql is pure Python, so I only use it when mysqlclient isn't installed.
+    """
+    try:
+        import MySQLdb  # noqa: F401
+    except ImportError:
+        return "pymysql"
+    return "mysqldb"
+
+
 def get_engine(
     user: str,
     password: str,
@@ -47,40 +95,229 @@ def get_engine(
 
     Important:
     - If the password contains special characters (like @, :, /), I URL-encode it.
+
+    Pool:
+    - The script only runs a handful of queries, so a small fixed pool is enough
+      (no overflow connections, no ping round-trip on every checkout).
+    - It must hold at least 3 connections: the main one plus the two threads
+      that fetch May and June in parallel.
     """
     safe_password = quote_plus(password)
-    connection_string = f"mysql+pymysql://{user}:{safe_password}@{host}:{port}/{database}"
-    return create_engine(connection_string)
+    driver = _mysql_driver()
+    connection_string = (
+        f"mysql+{driver}://{user}:{safe_password}@{host}:{port}/{database}?charset=utf8mb4"
+    )
+    return create_engine(
+        connection_string,
+        pool_size=4,
+        max_overflow=0,
+        pool_pre_ping=False,
+    )
+
+
+def read_rows(
+    query: TextClause,
+    engine: Engine | Connection,
+    params: dict | None = None,
+) -> pd.DataFrame:
+    """
+    Run a query that returns many rows (one per rental) as a DataFrame.
+
+    - With connectorx installed, the result is read column-wise by connectorx.
+      It doesn't support bound parameters for MySQL, so SQLAlchemy renders the
+      values into the SQL itself (literal_binds takes care of quoting).
+    - connectorx opens its own connection from the engine URL, so it ignores
+      a passed Connection. That's only worth it for big results: the small
+      aggregate queries use pd.read_sql on the connection they are given.
+    - Otherwise this is just pd.read_sql.
+    """
+    if cx is None:
+        return pd.read_sql(query, engine, params=params)
+
+    if params:
+        query = query.bindparams(**params)
+    sql = str(query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    url = engine.engine.url.set(drivername="mysql", query={})
+    return cx.read_sql(url.render_as_string(hide_password=False), sql, return_type="pandas")
+
+
+def _arrow_csv_matches_pandas(df: pd.DataFrame) -> bool:
+    """
+    Check that pyarrow would write exactly what df.to_csv(index=False) writes.
+
+    That's only true for the kinds of columns this lab produces:
+    - integers
+    - strings without commas, quotes or line breaks (no quoting needed)
+    - timestamps without time zone and with whole seconds, where at least one
+      value has a time part (pandas writes date-only text otherwise)
+    Floats and booleans are written differently (1.0 -> 1, True -> true).
+    """
+    for col, values in df.items():
+        if not isinstance(col, str) or any(ch in col for ch in ',"\r\n'):
+            return False
+
+        values = values.dropna()
+        if pd.api.types.is_integer_dtype(values.dtype):
+            continue
+        if pd.api.types.is_datetime64_dtype(values.dtype):
+            whole_seconds = ((values.dt.microsecond == 0) & (values.dt.nanosecond == 0)).all()
+            date_only = (values == values.dt.normalize()).all()
+            if whole_seconds and not date_only:
+                continue
+            return False
+        if pd.api.types.is_string_dtype(values):
+            if not (values.str.contains(r'[,"\r\n]') | (values == "")).any():
+                continue
+        return False
+
+    return True
+
+
+def fast_to_csv(df: pd.DataFrame, path: str) -> None:
+    """
+    Save a DataFrame to CSV (without the index), using pyarrow when installed.
+
+    Notes:
+    - pyarrow is only used when its output is the same as
+      df.to_csv(index=False) (see _arrow_csv_matches_pandas); any other
+      frame goes through pandas.
+    - Timestamps are cast to second precision (pyarrow would write
+      nanoseconds) and nothing is quoted (pyarrow quotes every string by
+      default).
+    """
+    if pa_csv is None or not _arrow_csv_matches_pandas(df):
+        df.to_csv(path, index=False)
+        return
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    schema = pa.schema([
+        field.with_type(pa.timestamp("s"))
+        if pa.types.is_timestamp(field.type) else field
+        for field in table.schema
+    ])
+    # pyarrow always quotes the header (quoting_header only exists in recent
+    # versions), so I write the header line myself and let pyarrow do the rows
+    options = pa_csv.WriteOptions(include_header=False, quoting_style="none")
+    with open(path, "wb") as f:
+        f.write((",".join(df.columns) + "\n").encode())
+        pa_csv.write_csv(table.cast(schema), f, write_options=options)
+
+
+def _month_range(month: int, year: int) -> tuple[date, date]:
+    """
+    Return the half-open range [start, end) that covers one calendar month.
+
+    Example: month=12, year=2005 -> (2005-12-01, 2006-01-01)
+    """
+    start = date(year, month, 1)
+    end = date(year + (month == 12), month % 12 + 1, 1)
+    return start, end
+
+
+# -----------------------------------------------------------------------------
+# SQL for one month (built once at import, not on every call)
+# -----------------------------------------------------------------------------
+# All of them filter with a date range instead of YEAR()/MONTH(): wrapping the
+# column in a function hides it from the index, so MySQL would scan the whole
+# table. Sakila already indexes rental_date (UNIQUE KEY rental_date), so
+# EXPLAIN shows type=range for these queries.
+_RENTALS_MONTH_QUERY = text("""
+    SELECT
+        rental_id,
+        rental_date,
+        customer_id
+    FROM rental
+    WHERE rental_date >= :start
+      AND rental_date < :end;
+""")
+
+_MONTH_STATE_QUERY = text("""
+    SELECT
+        COUNT(*) AS n_rentals,
+        MAX(last_update) AS last_update
+    FROM rental
+    WHERE rental_date >= :start
+      AND rental_date < :end;
+""")
 
 
 # -----------------------------------------------------------------------------
 # 1) rentals_month(engine, month, year)
 # -----------------------------------------------------------------------------
-def rentals_month(engine: Engine, month: int, year: int) -> pd.DataFrame:
+def rentals_month(engine: Engine | Connection, month: int, year: int) -> pd.DataFrame:
     """
     Retrieve rental data for a given month and year from the rental table
     and return it as a pandas DataFrame.
 
     Parameters:
-    - engine: SQLAlchemy engine connected to sakila
+    - engine: SQLAlchemy engine connected to sakila (or an open Connection)
     - month: integer month (e.g., 5 for May, 6 for June)
     - year: integer year (e.g., 2005)
 
     Returns:
     - DataFrame with rental_id, rental_date, customer_id
     """
-    query = text("""
-        SELECT
-            rental_id,
-            rental_date,
-            customer_id
-        FROM rental
-        WHERE YEAR(rental_date) = :year
-          AND MONTH(rental_date) = :month
-        ORDER BY rental_date;
-    """)
+    # Date range filter, see _RENTALS_MONTH_QUERY
+    start, end = _month_range(month, year)
+    df = read_rows(_RENTALS_MONTH_QUERY, engine, params={"start": start, "end": end})
+
+    # Sakila ids fit in int32: half the memory of the default int64, and
+    # half the bytes to hash/format later (groupby, CSV)
+    df = df.astype({"rental_id": "int32", "customer_id": "int32"})
+    return df
+
+
+def rentals_month_cached(
+    engine: Engine | Connection,
+    month: int,
+    year: int,
+    cache_dir: str = ".cache",
+) -> pd.DataFrame:
+    """
+    rentals_month with a parquet cache on disk, so reruns skip the download.
+
+    How the cache stays fresh:
+    - Before reading the cache I ask MySQL for COUNT(*) and MAX(last_update)
+      of the month (one small aggregate row). Both go into the file name, so
+      added, deleted or edited rentals give a new name and a cache miss.
+    - Older files for the same month are deleted when a new one is written.
+
+    Parquet needs pyarrow; without it this is just rentals_month.
+    """
+    if pa is None:
+        return rentals_month(engine, month, year)
+
+    start, end = _month_range(month, year)
+    state = pd.read_sql(_MONTH_STATE_QUERY, engine, params={"start": start, "end": end}).iloc[0]
+
+    n_rentals = int(state["n_rentals"])
+    stamp = f"{n_rentals}_{pd.Timestamp(state['last_update']):%Y%m%d%H%M%S}" if n_rentals else "0"
+    prefix = f"rentals_{year}_{month:02d}_"
+    path = os.path.join(cache_dir, f"{prefix}{stamp}.parquet")
+
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+
+    df = rentals_month(engine, month, year)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix) and name.endswith(".parquet"):
+            # Another run sharing the cache may have removed it already
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(cache_dir, name))
+
+    # Write to a temp file first and rename it: an interrupted write must not
+    # leave a truncated file under a name that looks like a valid cache entry
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
 
-    df = pd.read_sql(query, engine, params={"year": year, "month": month})
     return df
 
 
@@ -108,13 +345,37 @@ def rental_count_month(df_rentals: pd.DataFrame, month: int, year: int) -> pd.Da
     month_str = f"{month:02d}"
     col_name = f"rentals_{month_str}_{year}"
 
-    # groupby customer_id and count the number of rental_id rows
-    df_counts = (
-        df_rentals
-        .groupby("customer_id", as_index=False)["rental_id"]
-        .count()
-        .rename(columns={"rental_id": col_name})
+    # customer_id in Sakila is a small dense integer (1..599), so I can count
+    # with np.bincount: counts[i] = number of rentals of customer i.
+    # One pass in C, no hash table and no sort (unlike groupby).
+    customer_ids = df_rentals["customer_id"].to_numpy()
+
+    # bincount only works for non-negative integers, and it allocates max(id)+1
+    # slots. For anything else (NaN, negative or sparse ids) I use groupby.
+    is_dense = (
+        customer_ids.dtype.kind in "iu"
+        and customer_ids.size > 0
+        and customer_ids.min() >= 0
+        and customer_ids.max() <= 4 * customer_ids.size + 1024
     )
+    # groupby keeps its default sort=True here (unlike the sort=False used
+    # before bincount) so both paths return rows ordered by customer_id.
+    if not is_dense:
+        return (
+            df_rentals
+            .groupby("customer_id")
+            .size()
+            .rename(col_name)
+            .reset_index()
+        )
+
+    counts = np.bincount(customer_ids)
+    active = np.flatnonzero(counts)
+
+    df_counts = pd.DataFrame({
+        "customer_id": active.astype("int32"),
+        col_name: counts[active],
+    })
 
     return df_counts
 
@@ -142,8 +403,8 @@ def compare_rentals(df_counts_1: pd.DataFrame, df_counts_2: pd.DataFrame) -> pd.
       Use an INNER JOIN on customer_id (keeps only the intersection).
     """
     # Detect the rentals columns automatically (they start with "rentals_")
-    rentals_cols_1 = [c for c in df_counts_1.columns if c.startswith("rentals_")]
-    rentals_cols_2 = [c for c in df_counts_2.columns if c.startswith("rentals_")]
+    rentals_cols_1 = df_counts_1.columns[df_counts_1.columns.str.startswith("rentals_")]
+    rentals_cols_2 = df_counts_2.columns[df_counts_2.columns.str.startswith("rentals_")]
 
     if len(rentals_cols_1) != 1 or len(rentals_cols_2) != 1:
         raise ValueError(
@@ -154,13 +415,180 @@ def compare_rentals(df_counts_1: pd.DataFrame, df_counts_2: pd.DataFrame) -> pd.
     col_1 = rentals_cols_1[0]
     col_2 = rentals_cols_2[0]
 
-    # INNER JOIN keeps only customers present in both months (active in both months)
-    df_merged = df_counts_1.merge(df_counts_2, on="customer_id", how="inner")
+    # A counts table has one row per customer. A duplicated customer_id would
+    # silently multiply rows in the join (same check as merge(validate="one_to_one"))
+    if not (df_counts_1["customer_id"].is_unique and df_counts_2["customer_id"].is_unique):
+        raise ValueError(
+            "Each input DataFrame must have one row per customer_id "
+            "(found duplicated customer_id values)."
+        )
+
+    # Both paths return the rows sorted by customer_id: polars doesn't keep any
+    # row order in a join by default, so this makes the output the same
+    # whether polars is installed or not.
+    if pl is not None:
+        # Lazy polars pipeline: join + difference are planned and run as one
+        # query, and I only convert back to pandas at the end
+        lf_1 = pl.from_pandas(df_counts_1[["customer_id", col_1]]).lazy()
+        lf_2 = pl.from_pandas(df_counts_2[["customer_id", col_2]]).lazy()
+        return (
+            lf_1
+            .join(lf_2, on="customer_id", how="inner")
+            .with_columns((pl.col(col_2) - pl.col(col_1)).alias("difference"))
+            .sort("customer_id")
+            .collect()
+            .to_pandas()
+        )
+
+    # Index both months by customer_id: pandas aligns on the index, so an
+    # inner concat keeps only customers present in both months (same result as
+    # an INNER JOIN, without building a merge hash table). Unlike s2 - s1 +
+    # dropna(), the inner alignment never creates NaN, so counts stay integers.
+    s1 = df_counts_1.set_index("customer_id")[col_1]
+    s2 = df_counts_2.set_index("customer_id")[col_2]
+    df_merged = pd.concat([s1, s2], axis=1, join="inner")
 
     # difference = second month - first month
     df_merged["difference"] = df_merged[col_2] - df_merged[col_1]
 
-    return df_merged
+    return df_merged.rename_axis("customer_id").sort_index().reset_index()
+
+
+# -----------------------------------------------------------------------------
+# 3b) fetch_comparison(engine, month_1, year_1, month_2, year_2)
+# -----------------------------------------------------------------------------
+def _two_months(
+    month_1: int,
+    year_1: int,
+    month_2: int,
+    year_2: int,
+) -> tuple[dict, str, str]:
+    """
+    Bound parameters and rentals_MM_YYYY column names for a two-month query.
+    """
+    start_1, end_1 = _month_range(month_1, year_1)
+    start_2, end_2 = _month_range(month_2, year_2)
+
+    # Column names can't be bound parameters, but they're built from ints only
+    col_1 = f"rentals_{month_1:02d}_{year_1}"
+    col_2 = f"rentals_{month_2:02d}_{year_2}"
+
+    params = {"start_1": start_1, "end_1": end_1, "start_2": start_2, "end_2": end_2}
+    return params, col_1, col_2
+
+
+def _per_customer_sql(col_1: str, col_2: str) -> str:
+    """
+    SQL (used as a subquery) that counts the rentals of two months per
+    customer in a single range scan (conditional aggregation).
+    """
+    in_month_1 = "rental_date >= :start_1 AND rental_date < :end_1"
+    in_month_2 = "rental_date >= :start_2 AND rental_date < :end_2"
+
+    return f"""
+        SELECT
+            customer_id,
+            COUNT(CASE WHEN {in_month_1} THEN 1 END) AS {col_1},
+            COUNT(CASE WHEN {in_month_2} THEN 1 END) AS {col_2}
+        FROM rental
+        WHERE ({in_month_1})
+           OR ({in_month_2})
+        GROUP BY customer_id
+    """
+
+
+# The two-month queries depend on the column names, so they can't be module
+# constants like the one-month ones. lru_cache builds each text() once per
+# pair of months instead of on every call.
+@lru_cache(maxsize=None)
+def _comparison_query(col_1: str, col_2: str, active_in_both: bool) -> TextClause:
+    where = f"WHERE {col_1} > 0 AND {col_2} > 0" if active_in_both else ""
+    return text(f"""
+        SELECT
+            customer_id,
+            {col_1},
+            {col_2},
+            {col_2} - {col_1} AS difference
+        FROM ({_per_customer_sql(col_1, col_2)}) AS per_customer
+        {where};
+    """)
+
+
+@lru_cache(maxsize=None)
+def _summary_query(col_1: str, col_2: str) -> TextClause:
+    return text(f"""
+        SELECT
+            (SELECT COUNT(*) FROM rental) AS total_rentals,
+            SUM({col_1}) AS rentals_1,
+            SUM({col_2}) AS rentals_2,
+            SUM({col_1} > 0) AS customers_1,
+            SUM({col_2} > 0) AS customers_2,
+            SUM({col_1} > 0 AND {col_2} > 0) AS customers_both
+        FROM ({_per_customer_sql(col_1, col_2)}) AS per_customer;
+    """)
+
+
+def fetch_comparison(
+    engine: Engine | Connection,
+    month_1: int,
+    year_1: int,
+    month_2: int,
+    year_2: int,
+    active_in_both: bool = True,
+) -> pd.DataFrame:
+    """
+    Same output as compare_rentals(...) for two months, but in ONE query.
+
+    How it works:
+    - One range scan reads the rentals of both months.
+    - COUNT(CASE WHEN ...) counts each month separately (conditional aggregation).
+    - Keeping customers with rentals in both months is exactly the
+      INNER JOIN that compare_rentals does in pandas.
+    - difference = (month 2) - (month 1) is also computed by MySQL.
+
+    active_in_both=False keeps every customer with rentals in at least one of
+    the two months (the count is 0 for the other month). Both per-month counts
+    tables can then be selected from this one result.
+
+    Returns:
+    - DataFrame with columns: customer_id, rentals_MM_YYYY (month 1),
+      rentals_MM_YYYY (month 2), difference
+    """
+    params, col_1, col_2 = _two_months(month_1, year_1, month_2, year_2)
+    query = _comparison_query(col_1, col_2, active_in_both)
+    df = pd.read_sql(query, engine, params=params)
+    return df.astype({"customer_id": "int32"})
+
+
+# -----------------------------------------------------------------------------
+# 3c) fetch_summary(engine, month_1, year_1, month_2, year_2)
+# -----------------------------------------------------------------------------
+def fetch_summary(
+    engine: Engine | Connection,
+    month_1: int,
+    year_1: int,
+    month_2: int,
+    year_2: int,
+) -> pd.DataFrame:
+    """
+    Compute the summary metrics of the lab directly in MySQL (one row back).
+
+    Before, the summary used len() of the DataFrames, so the rows had to be
+    downloaded first. Here MySQL counts them where the data lives.
+
+    Returns:
+    - One-row DataFrame with columns:
+        total_rentals        all rentals in the table
+        rentals_1            rentals in month 1
+        rentals_2            rentals in month 2
+        customers_1          customers with rentals in month 1
+        customers_2          customers with rentals in month 2
+        customers_both       customers with rentals in both months
+    """
+    params, col_1, col_2 = _two_months(month_1, year_1, month_2, year_2)
+    df = pd.read_sql(_summary_query(col_1, col_2), engine, params=params)
+    # SUM() comes back as DECIMAL (or NULL when there are no rentals at all)
+    return df.fillna(0).astype("int64")
 
 
 # -----------------------------------------------------------------------------
@@ -175,31 +603,80 @@ if __name__ == "__main__":
     HOST = os.getenv("DB_HOST", "127.0.0.1")
     PORT = int(os.getenv("DB_PORT", 3306))
     DATABASE = os.getenv("DB_NAME", "sakila")
+    CACHE_DIR = os.getenv("RENTALS_CACHE_DIR", ".cache")
+    # SUMMARY_ONLY=1 -> only summary_metrics.csv (one query), for quick checks
+    SUMMARY_ONLY = os.getenv("SUMMARY_ONLY") == "1"
 
     engine = get_engine(USER, PASSWORD, HOST, PORT, DATABASE)
 
-    # -------------------------------------------------------------------------
-    # Quick connectivity check 
-    # -------------------------------------------------------------------------
-    df_test = pd.read_sql("SELECT COUNT(*) AS rentals FROM rental;", engine)
-    print("\nConnection test:")
-    print(df_test)
-
-    # -------------------------------------------------------------------------
-    # Step 1: Pull rentals for May and June 2005
-    # -------------------------------------------------------------------------
-    df_may_rentals = rentals_month(engine, month=5, year=2005)
-    df_june_rentals = rentals_month(engine, month=6, year=2005)
-
-    print("\nRentals rows fetched:")
-    print(f"May 2005 rentals rows:  {len(df_may_rentals)}")
-    print(f"June 2005 rentals rows: {len(df_june_rentals)}")
-
-    # -------------------------------------------------------------------------
-    # Step 2: Convert rentals into counts per customer
-    # -------------------------------------------------------------------------
-    df_may_counts = rental_count_month(df_may_rentals, month=5, year=2005)
-    df_june_counts = rental_count_month(df_june_rentals, month=6, year=2005)
+    # One connection for all the queries below: no pool checkout/return between
+    # queries, and the server keeps the same session for the whole run.
+    with engine.connect() as conn:
+        # ---------------------------------------------------------------------
+        # Summary metrics (computed by MySQL, also my connectivity check)
+        # ---------------------------------------------------------------------
+        df_summary = fetch_summary(conn, 5, 2005, 6, 2005).iloc[0]
+
+        summary = pd.DataFrame({
+            "metric": [
+                "total_rentals",
+                "may_rentals",
+                "june_rentals",
+                "may_active_customers",
+                "june_active_customers",
+                "active_both_months"
+            ],
+            "value": [
+                df_summary["total_rentals"],
+                df_summary["rentals_1"],
+                df_summary["rentals_2"],
+                df_summary["customers_1"],
+                df_summary["customers_2"],
+                df_summary["customers_both"]
+            ]
+        })
+
+        print("\nSummary metrics:")
+        print(summary)
+
+        fast_to_csv(summary, "summary_metrics.csv")
+        print("Saved: summary_metrics.csv")
+
+        if SUMMARY_ONLY:
+            raise SystemExit(0)
+
+        # ---------------------------------------------------------------------
+        # Step 1: Pull rentals for May and June 2005
+        # ---------------------------------------------------------------------
+        # The two months are independent, so I fetch them in parallel. Each
+        # thread checks out its own connection from the engine's pool (a
+        # Connection can't be shared between threads). Threads are enough here:
+        # they spend their time waiting on MySQL, not running Python code.
+        # (With connectorx installed, these raw reads use its own connections.)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            future_may = executor.submit(rentals_month_cached, engine, 5, 2005, CACHE_DIR)
+            future_june = executor.submit(rentals_month_cached, engine, 6, 2005, CACHE_DIR)
+            df_may_rentals = future_may.result()
+            df_june_rentals = future_june.result()
+
+        print("\nRentals rows fetched:")
+        print(f"May 2005 rentals rows:  {len(df_may_rentals)}")
+        print(f"June 2005 rentals rows: {len(df_june_rentals)}")
+
+        # ---------------------------------------------------------------------
+        # Step 2: Counts per customer for BOTH months, in one query
+        # ---------------------------------------------------------------------
+        # With active_in_both=False I also get the customers active in only one
+        # month, so the comparison and both counts tables come from this result.
+        df_both_months = fetch_comparison(conn, 5, 2005, 6, 2005, active_in_both=False)
+
+    col_may = "rentals_05_2005"
+    col_june = "rentals_06_2005"
+    active_may = df_both_months[col_may] > 0
+    active_june = df_both_months[col_june] > 0
+
+    df_may_counts = df_both_months.loc[active_may, ["customer_id", col_may]].sort_values("customer_id")
+    df_june_counts = df_both_months.loc[active_june, ["customer_id", col_june]].sort_values("customer_id")
 
     print("\nCustomers with rentals (counts table size):")
     print(f"May 2005 active customers:  {len(df_may_counts)}")
@@ -208,10 +685,14 @@ if __name__ == "__main__":
     # -------------------------------------------------------------------------
     # Step 3: Compare customers active in BOTH months + compute difference
     # -------------------------------------------------------------------------
-    df_comparison = compare_rentals(df_may_counts, df_june_counts)
+    # Same rows as fetch_comparison(...) / compare_rentals(...): the INNER JOIN
+    # is just "active in May AND active in June".
+    df_comparison = df_both_months[active_may & active_june]
 
-    # The biggest increase appears first
-    df_comparison = df_comparison.sort_values("difference", ascending=False)
+    # The biggest increase appears first. MySQL returns GROUP BY rows in no
+    # guaranteed order and many customers share a difference, so customer_id
+    # breaks the ties to keep the CSV reproducible.
+    df_comparison = df_comparison.sort_values(["difference", "customer_id"], ascending=[False, True])
 
     print("\nCustomers active in BOTH May and June 2005 (top 20 changes):")
     print(df_comparison.head(20))
@@ -219,7 +700,7 @@ if __name__ == "__main__":
     # -------------------------------------------------------------------------
     # Save results to CSV: comparison of both months
     # -------------------------------------------------------------------------
-    df_comparison.to_csv("customer_rentals_may_vs_june_2005.csv", index=False)
+    fast_to_csv(df_comparison, "customer_rentals_may_vs_june_2005.csv")
     print("\nSaved: customer_rentals_may_vs_june_2005.csv")
     
     # -------------------------------------------------------------------------
@@ -228,52 +709,17 @@ if __name__ == "__main__":
 
     # Individual rentals and counts for May and June 2005
 
-    df_may_counts.to_csv(
-    "customer_rentals_may_2005.csv",
-    index=False
-   )
-
-    df_june_counts.to_csv(
-    "customer_rentals_june_2005.csv",
-    index=False
-  )
-
-    # Individual rentals for May and June 2005 (raw data)
-
-    df_may_rentals.to_csv(
-    "rentals_raw_may_2005.csv",
-    index=False
-  )
-
-    df_june_rentals.to_csv(
-    "rentals_raw_june_2005.csv",
-    index=False
- )
-
-  # Summary metrics
-
-    summary = pd.DataFrame({
-    "metric": [
-        "total_rentals",
-        "may_rentals",
-        "june_rentals",
-        "may_active_customers",
-        "june_active_customers",
-        "active_both_months"
-    ],
-    "value": [
-        int(df_test["rentals"].iloc[0]),
-        len(df_may_rentals),
-        len(df_june_rentals),
-        len(df_may_counts),
-        len(df_june_counts),
-        len(df_comparison)
-    ]
-  })
-
-    summary.to_csv("summary_metrics.csv", index=False)
+    fast_to_csv(df_may_counts, "customer_rentals_may_2005.csv")
+    fast_to_csv(df_june_counts, "customer_rentals_june_2005.csv")
+
+    # Individual rentals for May and June 2005 (raw data).
+    # rentals_month doesn't sort (the counts don't need it), so I sort by date
+    # only here, to keep the raw files easy to read.
+
+    fast_to_csv(df_may_rentals.sort_values("rental_date", kind="stable"), "rentals_raw_may_2005.csv")
+    fast_to_csv(df_june_rentals.sort_values("rental_date", kind="stable"), "rentals_raw_june_2005.csv")
+
     print("Saved: customer_rentals_may_2005.csv")
     print("Saved: customer_rentals_june_2005.csv")
     print("Saved: rentals_raw_may_2005.csv")
-    print("Saved: rentals_raw_june_2005.csv")
-    print("Saved: summary_metrics.csv")
\ No newline at end of file
+    print("Saved: rentals_raw_june_2005.csv")
\ No newline at end of file
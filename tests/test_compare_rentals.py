@@ -0,0 +1,40 @@
+"""
+compare_rentals must return the same frame with the polars path and with the
+pandas fallback.
+"""
+
+import pandas as pd
+import pytest
+
+import lab_connecting_python_sql as lab
+
+DF_MAY = pd.DataFrame({"customer_id": [5, 2, 9, 7], "rentals_05_2005": [1, 3, 2, 4]})
+DF_JUNE = pd.DataFrame({"customer_id": [7, 9, 1, 5], "rentals_06_2005": [2, 6, 1, 1]})
+
+
+def test_compare_rentals_inner_join_sorted_by_customer(monkeypatch):
+    monkeypatch.setattr(lab, "pl", None)
+
+    df = lab.compare_rentals(DF_MAY, DF_JUNE)
+
+    assert df.columns.tolist() == ["customer_id", "rentals_05_2005", "rentals_06_2005", "difference"]
+    assert df["customer_id"].tolist() == [5, 7, 9]
+    assert df["difference"].tolist() == [0, -2, 4]
+
+
+def test_compare_rentals_polars_matches_pandas(monkeypatch):
+    pytest.importorskip("polars")
+    df_polars = lab.compare_rentals(DF_MAY, DF_JUNE)
+
+    monkeypatch.setattr(lab, "pl", None)
+    df_pandas = lab.compare_rentals(DF_MAY, DF_JUNE)
+
+    pd.testing.assert_frame_equal(df_polars, df_pandas, check_dtype=False)
+
+
+
+def test_compare_rentals_rejects_duplicate_customers():
+    df_dup = pd.concat([DF_MAY, DF_MAY.head(1)])
+
+    with pytest.raises(ValueError):
+        lab.compare_rentals(df_dup, DF_JUNE)
@@ -0,0 +1,54 @@
+"""
+fast_to_csv must write the same text as DataFrame.to_csv(index=False),
+whether pyarrow is used or not. I check it on the committed output files.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from lab_connecting_python_sql import _arrow_csv_matches_pandas, fast_to_csv
+
+REPO = Path(__file__).resolve().parent.parent
+
+
+def _load(name: str) -> pd.DataFrame:
+    df = pd.read_csv(REPO / name)
+    if "rental_date" in df.columns:
+        df["rental_date"] = pd.to_datetime(df["rental_date"])
+    # Same dtypes as the frames read from MySQL (ids are downcast on ingest)
+    id_cols = [c for c in ("rental_id", "customer_id") if c in df.columns]
+    return df.astype({c: "int32" for c in id_cols})
+
+
+@pytest.mark.parametrize("name", [
+    "summary_metrics.csv",
+    "customer_rentals_may_2005.csv",
+    "customer_rentals_may_vs_june_2005.csv",
+    "rentals_raw_may_2005.csv",
+])
+def test_fast_to_csv_matches_pandas(tmp_path, name):
+    df = _load(name)
+    path = tmp_path / name
+    # The lab's own frames must take the pyarrow path, not the fallback
+    assert _arrow_csv_matches_pandas(df)
+
+    fast_to_csv(df, str(path))
+
+    assert path.read_text() == df.to_csv(index=False)
+
+
+@pytest.mark.parametrize("df", [
+    pd.DataFrame({"value": [1.0, 2.5], "flag": [True, False]}),
+    pd.DataFrame({"day": pd.to_datetime(["2005-05-24", "2005-05-25"])}),
+    pd.DataFrame({"when": pd.to_datetime(["2005-05-24 22:53:30.250", "2005-05-25 10:00:00"], format="ISO8601")}),
+    pd.DataFrame({"metric": ["a,b", 'say "hi"'], "value": [1, 2]}),
+    pd.DataFrame({"when": pd.to_datetime(["2005-05-24 22:53:30", None]), "name": ["x", None]}),
+], ids=["float-bool", "date-only", "sub-second", "needs-quoting", "missing"])
+def test_fast_to_csv_matches_pandas_for_other_columns(tmp_path, df):
+    path = tmp_path / "out.csv"
+
+    fast_to_csv(df, str(path))
+
+    assert path.read_text() == df.to_csv(index=False)
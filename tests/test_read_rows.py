@@ -0,0 +1,41 @@
+"""
+read_rows with connectorx: the bound values are rendered into the SQL and the
+URL is the plain mysql:// one that connectorx expects.
+"""
+
+from datetime import date
+from types import SimpleNamespace
+
+from sqlalchemy import text
+from sqlalchemy.dialects import mysql
+from sqlalchemy.engine import make_url
+
+import lab_connecting_python_sql as lab
+
+
+def test_read_rows_renders_literals_for_connectorx(monkeypatch):
+    calls = []
+
+    def fake_read_sql(url, sql, return_type):
+        calls.append((url, sql, return_type))
+        return "df"
+
+    monkeypatch.setattr(lab, "cx", SimpleNamespace(read_sql=fake_read_sql))
+
+    # Only the dialect and the URL are used, so no MySQL driver is needed
+    engine = SimpleNamespace(
+        dialect=mysql.dialect(),
+        url=make_url("mysql+pymysql://user:p%40ss@db:3306/sakila?charset=utf8mb4"),
+    )
+    engine.engine = engine
+    query = text("SELECT rental_id FROM rental WHERE rental_date >= :start AND rental_date < :end")
+
+    result = lab.read_rows(query, engine, params={"start": date(2005, 5, 1), "end": date(2005, 6, 1)})
+
+    assert result == "df"
+    [(url, sql, return_type)] = calls
+    assert url == "mysql://user:p%40ss@db:3306/sakila"
+    assert "rental_date >= '2005-05-01'" in sql
+    assert "rental_date < '2005-06-01'" in sql
+    assert ":start" not in sql
+    assert return_type == "pandas"
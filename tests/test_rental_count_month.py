@@ -0,0 +1,32 @@
+"""
+rental_count_month counts with np.bincount for dense ids and falls back to
+groupby otherwise. Both paths must give the same counts.
+"""
+
+import pandas as pd
+import pytest
+
+from lab_connecting_python_sql import rental_count_month
+
+
+@pytest.mark.parametrize("ids", [
+    [3, 1, 3],                 # dense -> bincount
+    [-1, 3, 3],                # negative -> groupby
+    [2**40, 3, 2**40],         # sparse, above int32 -> groupby
+])
+def test_rental_count_month_matches_groupby(ids):
+    df_rentals = pd.DataFrame({"customer_id": ids})
+
+    df_counts = rental_count_month(df_rentals, month=5, year=2005)
+
+    expected = df_rentals.groupby("customer_id").size()
+    assert df_counts.columns.tolist() == ["customer_id", "rentals_05_2005"]
+    assert dict(zip(df_counts["customer_id"], df_counts["rentals_05_2005"])) == expected.to_dict()
+
+
+def test_rental_count_month_skips_missing_ids():
+    df_rentals = pd.DataFrame({"customer_id": [3, None, 3]})
+
+    df_counts = rental_count_month(df_rentals, month=5, year=2005)
+
+    assert df_counts["rentals_05_2005"].tolist() == [2]
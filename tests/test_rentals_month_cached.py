@@ -0,0 +1,84 @@
+"""
+rentals_month_cached: cache hits, invalidation and atomic writes, checked on an
+in-memory SQLite rental table.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+import lab_connecting_python_sql as lab
+
+ROWS = pd.DataFrame({
+    "rental_id": [1, 2, 3],
+    "rental_date": ["2005-05-24 22:53:30", "2005-05-25 10:00:00", "2005-06-01 09:00:00"],
+    "customer_id": [130, 459, 130],
+    "last_update": ["2006-02-15 21:30:53"] * 3,
+})
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(lab, "cx", None)
+    engine = create_engine("sqlite://")
+    ROWS.to_sql("rental", engine, index=False)
+    return engine
+
+
+def test_second_call_hits_the_cache(engine, tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    df_first = lab.rentals_month_cached(engine, 5, 2005, str(tmp_path))
+
+    monkeypatch.setattr(lab, "rentals_month", lambda *args: pytest.fail("cache was not used"))
+    df_second = lab.rentals_month_cached(engine, 5, 2005, str(tmp_path))
+
+    assert len(df_first) == 2
+    pd.testing.assert_frame_equal(df_second, df_first)
+
+
+@pytest.mark.parametrize("change", [
+    "INSERT INTO rental VALUES (4, '2005-05-30 12:00:00', 7, '2006-02-15 21:30:53')",
+    "UPDATE rental SET customer_id = 8, last_update = '2006-03-01 08:00:00' WHERE rental_id = 1",
+])
+def test_changed_month_replaces_the_cache_file(engine, tmp_path, change):
+    pytest.importorskip("pyarrow")
+    lab.rentals_month_cached(engine, 5, 2005, str(tmp_path))
+    [old_file] = os.listdir(tmp_path)
+
+    with engine.begin() as conn:
+        conn.execute(text(change))
+    df = lab.rentals_month_cached(engine, 5, 2005, str(tmp_path))
+
+    [new_file] = os.listdir(tmp_path)
+    assert new_file != old_file
+    pd.testing.assert_frame_equal(df, lab.rentals_month(engine, 5, 2005))
+
+
+def test_no_temp_file_left_behind(engine, tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    lab.rentals_month_cached(engine, 5, 2005, str(tmp_path))
+    assert all(name.endswith(".parquet") for name in os.listdir(tmp_path))
+
+    # An interrupted write leaves nothing that could pass for a cache entry
+    def broken_to_parquet(self, path, **kwargs):
+        with open(path, "wb") as f:
+            f.write(b"PAR1 truncated")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", broken_to_parquet)
+    with pytest.raises(OSError):
+        lab.rentals_month_cached(engine, 6, 2005, str(tmp_path))
+
+    assert not [name for name in os.listdir(tmp_path) if "_06_" in name or name.endswith(".tmp")]
+
+
+def test_without_pyarrow_falls_through_to_rentals_month(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(lab, "pa", None)
+    cache_dir = tmp_path / "cache"
+
+    df = lab.rentals_month_cached(engine, 5, 2005, str(cache_dir))
+
+    pd.testing.assert_frame_equal(df, lab.rentals_month(engine, 5, 2005))
+    assert not cache_dir.exists()
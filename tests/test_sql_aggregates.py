@@ -0,0 +1,79 @@
+"""
+The SQL aggregates must give the same tables as the pandas pipeline
+(rentals_month -> rental_count_month -> compare_rentals). I load the committed
+raw May/June rentals into an in-memory SQLite rental table.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from lab_connecting_python_sql import (
+    compare_rentals,
+    fetch_comparison,
+    fetch_summary,
+    rental_count_month,
+)
+
+REPO = Path(__file__).resolve().parent.parent
+
+
+def _sorted(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values("customer_id").reset_index(drop=True)
+
+
+@pytest.fixture(scope="module")
+def df_rentals():
+    return {
+        5: pd.read_csv(REPO / "rentals_raw_may_2005.csv"),
+        6: pd.read_csv(REPO / "rentals_raw_june_2005.csv"),
+    }
+
+
+@pytest.fixture(scope="module")
+def engine(df_rentals):
+    engine = create_engine("sqlite://")
+    pd.concat(df_rentals.values()).to_sql("rental", engine, index=False)
+    return engine
+
+
+def test_fetch_comparison_matches_pandas_pipeline(engine, df_rentals):
+    expected = compare_rentals(
+        rental_count_month(df_rentals[5], month=5, year=2005),
+        rental_count_month(df_rentals[6], month=6, year=2005),
+    )
+
+    df = fetch_comparison(engine, 5, 2005, 6, 2005)
+
+    assert len(df) == 512
+    pd.testing.assert_frame_equal(_sorted(df), _sorted(expected), check_dtype=False)
+
+
+def test_fetch_summary_matches_dataframe_lengths(engine, df_rentals):
+    df_counts = {m: rental_count_month(df_rentals[m], month=m, year=2005) for m in (5, 6)}
+
+    summary = fetch_summary(engine, 5, 2005, 6, 2005).iloc[0]
+
+    assert summary.to_dict() == {
+        "total_rentals": len(df_rentals[5]) + len(df_rentals[6]),
+        "rentals_1": len(df_rentals[5]),
+        "rentals_2": len(df_rentals[6]),
+        "customers_1": len(df_counts[5]),
+        "customers_2": len(df_counts[6]),
+        "customers_both": len(compare_rentals(df_counts[5], df_counts[6])),
+    }
+    assert list(summary) == [1156 + 2311, 1156, 2311, 520, 590, 512]
+
+
+def test_fetch_comparison_all_customers_gives_monthly_counts(engine, df_rentals):
+    df_both_months = fetch_comparison(engine, 5, 2005, 6, 2005, active_in_both=False)
+
+    for month, n_customers in ((5, 520), (6, 590)):
+        col = f"rentals_{month:02d}_2005"
+        df_month = df_both_months.loc[df_both_months[col] > 0, ["customer_id", col]]
+        expected = rental_count_month(df_rentals[month], month=month, year=2005)
+
+        assert len(df_month) == n_customers
+        pd.testing.assert_frame_equal(_sorted(df_month), _sorted(expected), check_dtype=False)